@@ -51,6 +51,7 @@ assert output.stdout.strip() == "2"
 from __future__ import annotations
 
 import argparse
+import contextlib
 import os
 import re
 import subprocess
@@ -58,13 +59,20 @@ import tempfile
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, fields, replace
 from enum import Enum
+from functools import cache
 from itertools import chain
 from pathlib import Path
 from shutil import which
 from subprocess import Popen
 from typing import IO, Any, Generic, Sequence, TypeVar
 
-from diopter.utils import CommandOutput, run_cmd, run_cmd_async, temporary_file
+from diopter.utils import (
+    CommandOutput,
+    kill_process,
+    run_cmd,
+    run_cmd_async,
+    temporary_file,
+)
 
 
 class Language(Enum):
@@ -149,7 +157,8 @@ class SourcePath:
         """Delete the temporary file if it still exists"""
         if self.tempfile is None:
             return
-        if Path(self.filename).exists():
+        self.tempfile.close()
+        with contextlib.suppress(FileNotFoundError):
             os.remove(self.filename)
 
 
@@ -547,7 +556,7 @@ def parse_compiler(compiler_exe: Path) -> tuple[CompilerProject, Revision] | Non
             compiler project (LLVM or GCC)  and the parsed version, None if
             the parsing failed
     """
-    info = run_cmd(f"{str(compiler_exe)} -v".split())
+    info = run_cmd([str(compiler_exe), "-v"])
     for line in info.stderr.splitlines():
         if "clang version" in line:
             return CompilerProject.LLVM, line[len("clang version") :].strip()
@@ -583,7 +592,7 @@ class CompilerExe:
         str:
             the output of exe -v
         """
-        return run_cmd(f"{self.exe} -v".split()).stderr
+        return run_cmd([str(self.exe), "-v"]).stderr
 
     @staticmethod
     def get_system_gcc() -> CompilerExe:
@@ -769,21 +778,31 @@ class CompilationOutput(ABC):
         """Delete the temporary file if one was created and still exists"""
         if self.temporary_file is None:
             return
-        if Path(self.filename).exists():
+        with contextlib.suppress(FileNotFoundError):
             os.remove(self.filename)
 
     def to_cmd(self) -> str:
         """Create the relevant compilation flags for this output.
 
-        Used in CompilationSetting.get_compilation_cmd.
-
         Returns:
             str:
                 the necessary compilation flags, e.g., "-c -o filename.o"
         """
+        return " ".join(self.to_cmd_args())
+
+    def to_cmd_args(self) -> list[str]:
+        """Create the relevant compilation flags for this output as
+        separate arguments.
+
+        Used in CompilationSetting.get_compilation_cmd.
+
+        Returns:
+            list[str]:
+                the necessary compilation flags, e.g., ["-c", "-o", "filename.o"]
+        """
         if type(self).empty_command():
-            return ""
-        return type(self).flag() + " -o " + str(self.filename)
+            return []
+        return type(self).flag().split() + ["-o", str(self.filename)]
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, CompilationOutput):
@@ -854,7 +873,7 @@ class BinaryOutputMixin(ABC):
 
         Useful, e.g., for comparing whether two outputs are equal.
         """
-        run_cmd(f"strip {self.filename}")
+        run_cmd(["strip", str(self.filename)], capture=False)
 
     def read(self) -> bytes:
         """Read the output.
@@ -874,7 +893,7 @@ class BinaryOutputMixin(ABC):
             int:
                 The binary's text section size.
         """
-        size_cmd_output = run_cmd(f"size {self.filename}").stdout
+        size_cmd_output = run_cmd(["size", str(self.filename)]).stdout
         line = list(size_cmd_output.splitlines())[-1].strip()
         s = line.split()[0]
         return int(s)
@@ -911,7 +930,7 @@ class ExeCompilationOutput(CompilationOutput, BinaryOutputMixin):
             CommandOutput:
                 the captured stdout and stderr
         """
-        return run_cmd(f"{self.filename} {' '.join(flags)}", timeout=timeout)
+        return run_cmd([str(self.filename), *flags], timeout=timeout, new_session=True)
 
     @staticmethod
     def flag() -> str:
@@ -1054,13 +1073,13 @@ class AsyncCompilationResult(Generic[CompilationOutputType]):
     output: CompilationOutputType
 
     def result(
-        self, timeout: int | None = None
+        self, timeout: float | None = None
     ) -> CompilationResult[CompilationOutputType]:
         """Waits for the subprocess to finish
         and returns the compilation output.
 
         Args:
-            timeout (int | None):
+            timeout (float | None):
                 if not None, how many seconds to wait before
                 raising a subprocess.TimeoutExpired
 
@@ -1094,19 +1113,62 @@ class AsyncCompilationResult(Generic[CompilationOutputType]):
             stdout_stderr_output=outs + "\n" + errs,
         )
 
-    def wait(self, timeout: int | None = None) -> None:
+    def wait(self, timeout: float | None = None) -> None:
         """Waits for the subprocess to finish.
 
         Args:
-            timeout (int | None):
+            timeout (float | None):
                 if not None, how many seconds to wait before
                 raising a subprocess.TimeoutExpired
         """
         self.proc.wait(timeout)
 
+    def kill(self) -> None:
+        """Kills the subprocess if it is still running."""
+        kill_process(self.proc)
+
     def __del__(self) -> None:
-        if not self.proc.returncode:
-            self.proc.kill()
+        """Kill the subprocess (and reap it) if it is still running"""
+        self.kill()
+
+
+# malloc attributes with args, clang doesn't understand these
+MALLOC_ATTRIBUTE_WITH_ARGS_RE = re.compile(
+    r"__attribute__ \(\(__malloc__ \(.*, .*\)\)\)"
+)
+# f128 builtins, clang doesn't understand these
+F128_BUILTIN_DECLARATION_RE = re.compile(r"extern int [^;]*f128[^;]*;")
+# _Float*** typedefs, gcc doesn't like these
+FLOAT_TYPEDEF_RE = re.compile(r"typedef [^;]*_Float\d+x?;")
+# remaining _FloatX types and their standard replacements
+FLOATX_TYPE_RE = re.compile(r"_Float(32x|64x|32|64)")
+FLOATX_TYPE_REPLACEMENTS = {
+    "32x": "double",
+    "64x": "long double",
+    "32": "float",
+    "64": "double",
+}
+
+
+def make_code_compiler_agnostic(preprocessed_source: str) -> str:
+    """Removes or replaces constructs in preprocessed code that
+    only one of gcc and clang understands.
+
+    Args:
+        preprocessed_source (str):
+            preprocessed code, e.g., from `CompilationSetting.preprocess_program`
+
+    Returns:
+        str:
+            code that can be compiled with both gcc and clang
+    """
+    preprocessed_source = MALLOC_ATTRIBUTE_WITH_ARGS_RE.sub("", preprocessed_source)
+    preprocessed_source = F128_BUILTIN_DECLARATION_RE.sub("", preprocessed_source)
+    preprocessed_source = FLOAT_TYPEDEF_RE.sub("", preprocessed_source)
+    # a single pass over the code for all _FloatX types
+    return FLOATX_TYPE_RE.sub(
+        lambda m: FLOATX_TYPE_REPLACEMENTS[m[1]], preprocessed_source
+    )
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -1177,7 +1239,7 @@ class CompilationSetting:
                 whether to include additional flags that specify
                 the source language and relevant linker flags
         Returns:
-            str:
+            list[str]:
                 The assembled compilation command
         """
         cmd = list(
@@ -1189,7 +1251,7 @@ class CompilationSetting:
                 (
                     (program[0].language.get_language_flag(),)
                     if include_language_flags
-                    else ("",)
+                    else ()
                 ),
                 self.flags,
                 (f"-I{path}" for path in self.include_paths),
@@ -1203,7 +1265,7 @@ class CompilationSetting:
         if include_language_flags and isinstance(output, ExeCompilationOutput):
             if linker_flag := program[0].language.get_linker_flag():
                 cmd.append(linker_flag)
-        cmd.append(output.to_cmd())
+        cmd.extend(output.to_cmd_args())
         return cmd
 
     def compile_program(
@@ -1240,6 +1302,7 @@ class CompilationSetting:
                 cmd,
                 timeout=timeout,
                 additional_env={"TMPDIR": tempfile.gettempdir()},
+                new_session=True,
             )
         except subprocess.CalledProcessError as e:
             raise CompileError.from_called_process_exception(" ".join(cmd), e)
@@ -1256,6 +1319,9 @@ class CompilationSetting:
         additional_flags: tuple[str, ...] = tuple(),
         stdout: IO[str] | int | None = subprocess.PIPE,
         stderr: IO[str] | int | None = subprocess.PIPE,
+        launcher: tuple[str, ...] = tuple(),
+        working_dir: Path | None = None,
+        additional_env: dict[str, str] = {},
     ) -> AsyncCompilationResult[CompilationOutputType]:
         """Compile a program with this setting asynchronously.
 
@@ -1270,23 +1336,33 @@ class CompilationSetting:
                 the desired output, e.g., executable or object file
             additional_flags (tuple[str, ...]):
                 additional flags used for the compilation
+            launcher (tuple[str, ...]):
+                a command the compiler invocation is prefixed with, e.g., ccache
+            working_dir (Path | None):
+                the directory to run the compiler in, the current one if None
+            additional_env (dict[str, str]):
+                environment variables to set for the compiler (and launcher)
 
         Returns:
             AsyncCompilationResult[CompilationOutputType]:
                 The result of the compilation (if successful).
         """
         code_file = program.get_filename()
-        cmd = self.get_compilation_cmd(
-            (program, code_file.filename), output, True
-        ) + list(additional_flags)
+        cmd = (
+            list(launcher)
+            + self.get_compilation_cmd((program, code_file.filename), output, True)
+            + list(additional_flags)
+        )
         return AsyncCompilationResult(
             " ".join(cmd),
             run_cmd_async(
                 cmd,
-                additional_env={"TMPDIR": tempfile.gettempdir()},
+                working_dir=working_dir,
+                additional_env={"TMPDIR": tempfile.gettempdir(), **additional_env},
                 text=True,
                 stdout=stdout,
                 stderr=stderr,
+                new_session=True,
             ),
             code_file,
             output,
@@ -1326,25 +1402,7 @@ class CompilationSetting:
         preprocessed_source = result.output.read()
 
         if make_compiler_agnostic:
-            # remove malloc attributes with args, clang doesn't understand these
-            preprocessed_source = re.sub(
-                r"__attribute__ \(\(__malloc__ \(.*, .*\)\)\)", r"", preprocessed_source
-            )
-            # remove f128 builtins builtins, clang doesn't understand these
-            preprocessed_source = re.sub(
-                r"extern int [^;]*f128[^;]*;", r"", preprocessed_source
-            )
-            # remove Float*** typedefs, gcc doesn't like these
-            preprocessed_source = re.sub(
-                r"typedef [^;]*_Float\d+x?;", r"", preprocessed_source
-            )
-            # replace remaining FloatX types with the standard ones
-            preprocessed_source = re.sub(r"_Float32x", r"double", preprocessed_source)
-            preprocessed_source = re.sub(
-                r"_Float64x", r"long double", preprocessed_source
-            )
-            preprocessed_source = re.sub(r"_Float32", r"float", preprocessed_source)
-            preprocessed_source = re.sub(r"_Float64", r"double", preprocessed_source)
+            preprocessed_source = make_code_compiler_agnostic(preprocessed_source)
 
         return program.with_preprocessed_code(preprocessed_source)
 
@@ -1414,6 +1472,7 @@ class CompilationSetting:
                 cmd,
                 timeout=timeout,
                 additional_env={"TMPDIR": str(tempfile.gettempdir())},
+                new_session=True,
             )
         except subprocess.CalledProcessError as e:
             raise CompileError.from_called_process_exception(" ".join(cmd), e)
@@ -1460,6 +1519,7 @@ class CompilationSetting:
                 text=True,
                 stdout=stdout,
                 stderr=stderr,
+                new_session=True,
             ),
             None,
             output,
@@ -1518,7 +1578,7 @@ def parse_opt_version(opt_exe: Path) -> Revision | None:
             compiler project (LLVM or GCC)  and the parsed version, None if
             the parsing failed
     """
-    info = run_cmd(f"{str(opt_exe)} --version".split())
+    info = run_cmd([str(opt_exe), "--version"])
     for line in info.stdout.splitlines():
         if "LLVM version" in line:
             return line[len("LLVM version") :].strip()
@@ -1570,11 +1630,13 @@ class Opt:
                 cmd,
                 timeout=timeout,
                 additional_env={"TMPDIR": str(tempfile.gettempdir())},
+                new_session=True,
             )
         except subprocess.CalledProcessError as e:
             raise CompileError.from_called_process_exception(" ".join(cmd), e)
 
 
+@cache
 def find_standard_include_paths(
     clang: CompilerExe, cpp: bool = False
 ) -> tuple[str, ...]:
@@ -1583,6 +1645,8 @@ def find_standard_include_paths(
     This is used by clang tools as the standard include paths must be
     explicilty passed to them.
 
+    The paths only depend on the clang executable, so the result is cached.
+
     Args:
         clang (CompilerExe): the clang executable from which to extract the paths
         cpp (bool): whether to include the standard c++ includes
@@ -1643,7 +1707,6 @@ class ClangTool:
     standard_c_include_paths: tuple[str, ...]
     standard_cxx_include_paths: tuple[str, ...]
 
-    # TODO: @cache?
     @staticmethod
     def init_with_paths_from_clang(exe: Path, clang: CompilerExe) -> ClangTool:
         """Create a clang tool using clang's standard include paths.
@@ -1711,6 +1774,7 @@ class ClangTool:
                 cmd,
                 timeout=timeout,
                 additional_env={"TMPDIR": str(tempfile.gettempdir())},
+                new_session=True,
             )
         except subprocess.CalledProcessError as e:
             raise CompileError.from_called_process_exception(" ".join(cmd), e)
@@ -1736,6 +1800,10 @@ class ClangTool:
                     )
 
 
+# asm statements, ccomp doesn't like these
+ASM_STATEMENT_RE = re.compile(r"__asm__ [^\)]*\)")
+
+
 @dataclass(frozen=True, kw_only=True)
 class CComp:
     """A ccomp(compcert) instance.
@@ -1765,6 +1833,7 @@ class CComp:
         timeout: int | None = None,
         debug: bool = False,
         additional_flags: tuple[str, ...] = tuple(),
+        tmpdir: Path | None = None,
     ) -> bool:
         """Checks the input program for errors using ccomp's interpreter mode.
 
@@ -1773,6 +1842,8 @@ class CComp:
            timeout (int | None): timeout in seconds for the checking
            debug (bool): if true ccomp's output will be printed on failure
            additional_flags (tuple[str, ...]): additional flags used for CompCert
+           tmpdir (Path | None): where to create temporary files, the default
+               temporary directory if None
 
         Returns:
             bool:
@@ -1780,10 +1851,9 @@ class CComp:
         """
         assert program.language == Language.C
 
-        # ccomp doesn't like these
-        code = re.sub(r"__asm__ [^\)]*\)", r"", program.get_modified_code())
+        code = ASM_STATEMENT_RE.sub("", program.get_modified_code())
 
-        tf = temporary_file(contents=code, suffix=".c")
+        tf = temporary_file(contents=code, suffix=".c", dir=tmpdir)
         cmd = (
             [
                 str(self.exe),
@@ -1801,8 +1871,10 @@ class CComp:
         try:
             run_cmd(
                 cmd,
-                additional_env={"TMPDIR": str(tempfile.gettempdir())},
+                additional_env={"TMPDIR": str(tmpdir or tempfile.gettempdir())},
+                capture=debug,
                 timeout=timeout,
+                new_session=True,
             )
         except subprocess.CalledProcessError as e:
             if debug:
@@ -234,7 +234,7 @@ class Reducer:
                 creduce_cmd.append("--debug")
 
             if timeout is not None:
-                creduce_cmd.append(f"--timeout {timeout}")
+                creduce_cmd.extend(["--timeout", str(timeout)])
 
             creduce_cmd.extend(additional_args)
 
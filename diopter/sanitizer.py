@@ -2,7 +2,9 @@
 
 The following checks are currently supported: checking for compiler warnings,
 checking a program with clang's undefined behaviour and address sanitizers,
-checking a program with CompCert (ccomp).
+checking a program with CompCert (ccomp). Sanitization results can optionally
+be cached on disk, which pays off when the same programs are checked
+repeatedly, e.g., during reduction.
 
 Example:
 
@@ -14,11 +16,24 @@ if not sanitizer.sanitize(program):
 
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import json
+import os
+import re
+import selectors
 import subprocess
-from dataclasses import dataclass
+import tempfile
+import time
+from concurrent.futures import Executor, as_completed
+from dataclasses import dataclass, fields, replace
 from pathlib import Path
+from shutil import copy2, copyfileobj, which
+from subprocess import Popen
+from typing import Any, Iterable
 
 from diopter.compiler import (
+    AsyncCompilationResult,
     CComp,
     CompilationSetting,
     CompileError,
@@ -27,9 +42,11 @@ from diopter.compiler import (
     Language,
     ObjectCompilationOutput,
     OptLevel,
+    Source,
+    SourceFile,
     SourceProgram,
 )
-from diopter.utils import TempDirEnv, run_cmd
+from diopter.utils import TempDirEnv, kill_process, run_cmd_async
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -60,6 +77,71 @@ class SanitizationResult:
     def __ne__(self, other: object) -> bool:
         return not self.__eq__(other)
 
+    def to_json_dict(self) -> dict[str, Any]:
+        """Returns a dictionary that can be serialized to json.
+
+        Returns:
+            dict[str, Any]:
+                the dictionary
+        """
+        j = {
+            "check_warnings_failed": self.check_warnings_failed,
+            "sanitizer_failed": self.sanitizer_failed,
+            "ccomp_failed": self.ccomp_failed,
+            "timeout": self.timeout,
+        }
+        assert set(j.keys()) == set(field.name for field in fields(self))
+        return j
+
+    @staticmethod
+    def from_json_dict(j: dict[str, Any]) -> SanitizationResult:
+        """Returns a result parsed from a json dictionary.
+
+        Args:
+            j (dict[str, Any]):
+                the dictionary, created with `to_json_dict`
+
+        Returns:
+            SanitizationResult:
+                the result
+        """
+        return SanitizationResult(
+            check_warnings_failed=j["check_warnings_failed"],
+            sanitizer_failed=j["sanitizer_failed"],
+            ccomp_failed=j["ccomp_failed"],
+            timeout=j["timeout"],
+        )
+
+
+def write_source_file(program: SourceProgram, directory: Path) -> SourceFile:
+    """Writes the program's code to a file in `directory`.
+
+    The resulting SourceFile can be compiled repeatedly without
+    writing the code to a new temporary file each time.
+
+    Args:
+        program (SourceProgram):
+            the program to write
+        directory (Path):
+            where to write the code
+
+    Returns:
+        SourceFile:
+            the written file with the same language, macros,
+            include paths and flags as `program`
+    """
+    filename = directory / ("code" + program.get_file_suffix())
+    with open(filename, "w") as f:
+        f.write(program.get_modified_code())
+    return SourceFile(
+        filename=filename,
+        language=program.language,
+        defined_macros=program.defined_macros,
+        include_paths=program.include_paths,
+        system_include_paths=program.system_include_paths,
+        flags=program.flags,
+    )
+
 
 def supports_gnu2x(compiler: CompilerExe) -> bool:
     try:
@@ -73,6 +155,98 @@ def supports_gnu2x(compiler: CompilerExe) -> bool:
         return False
 
 
+def tool_fingerprint(exe: Path) -> str:
+    """Identifies an executable by its resolved path and modification time.
+
+    Used to invalidate cached results when a tool is rebuilt or upgraded.
+
+    Args:
+        exe (Path):
+            the executable, either a path or a name in PATH
+
+    Returns:
+        str:
+            the fingerprint
+    """
+    resolved = which(str(exe))
+    if not resolved:
+        return str(exe)
+    path = Path(resolved).resolve()
+    return f"{path}:{path.stat().st_mtime_ns}"
+
+
+def absolute_exe(exe: Path) -> Path:
+    """Makes a relative path to an executable absolute.
+
+    Bare names are left as they are, they are looked up in PATH.
+
+    Args:
+        exe (Path):
+            the executable, either a path or a name in PATH
+
+    Returns:
+        Path:
+            the executable, usable from any working directory
+    """
+    if len(exe.parts) == 1:
+        return exe
+    return exe.absolute()
+
+
+def evict_least_recently_used(directory: Path, max_size: int) -> None:
+    """Removes the least recently accessed files in directory until their
+    total size is at most max_size bytes.
+
+    Files starting with "." are in-progress writes and are ignored.
+
+    Args:
+        directory (Path):
+            the directory to trim
+        max_size (int):
+            the maximum total size in bytes
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.startswith("."):
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            st = entry.stat()
+            entries.append((st.st_atime, st.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        total_size -= size
+
+
+def compile_warnings_pattern(warnings: tuple[str, ...]) -> re.Pattern[bytes] | None:
+    """Compiles the warnings into a single regex matching any of them.
+
+    The pattern is used to report which warnings were found. It matches
+    the utf-8 encoded warnings such that the raw compiler output does
+    not have to be decoded.
+
+    Args:
+        warnings (tuple[str,...]):
+            the warnings to match, duplicates are ignored
+
+    Returns:
+        re.Pattern[bytes] | None:
+            the combined pattern, None if there are no warnings
+    """
+    if not warnings:
+        return None
+    # Longer warnings first such that the most specific one is reported
+    unique_warnings = sorted(
+        dict.fromkeys(warning.encode("utf-8") for warning in warnings),
+        key=len,
+        reverse=True,
+    )
+    return re.compile(b"|".join(re.escape(warning) for warning in unique_warnings))
+
+
 class Sanitizer:
     """A wrapper of various sanitization methods.
 
@@ -90,8 +264,14 @@ class Sanitizer:
             clang used for checking compiler warnings and ub/address sanitizers result
         ccomp (CComp | None):
             CompCert used for validating the program
-        checked_warnings (tuple[str,...] | None):
+        ccache (Path | None):
+            ccache used as a launcher when checking for compiler warnings
+        checked_warnings (tuple[str,...]):
             the warnings whose presence to check
+        checked_warnings_pattern (re.Pattern[bytes] | None):
+            a single regex matching any of the checked_warnings
+        checked_warnings_bytes (tuple[bytes, ...]):
+            the unique utf-8 encoded checked_warnings
         use_ub_address_sanitizer (bool):
             whether Sanitizer.sanitize should use clang's ub and address sanitizers
         use_memory_sanitizer (bool):
@@ -108,6 +288,20 @@ class Sanitizer:
             seconds to wait before aborting when executing the program (ub/asan)
         ccomp_timeout  (int):
             seconds to wait before aborting when interpreting the program with ccomp
+        cache_dir (Path | None):
+            where to cache sanitization results and instrumented binaries,
+            caching is disabled if None
+        max_exe_cache_size (int):
+            the maximum total size in bytes of the cached instrumented binaries
+        max_checks_cache_size (int):
+            the (approximate) maximum total size in bytes of the cached
+            sanitization results
+        tmp_dir (Path | None):
+            where to create temporary files, the default temporary directory
+            is used if None
+        early_sanitizer_builds (bool):
+            whether Sanitizer.sanitize starts the sanitizer builds together
+            with the compiler warnings checks instead of after them
         debug (bool):
             if True then additional info is printed when sanitizing programs
     """
@@ -159,9 +353,11 @@ class Sanitizer:
         use_ub_address_sanitizer: bool = True,
         use_memory_sanitizer: bool = False,
         use_ccomp_if_available: bool = True,
+        use_ccache_if_available: bool = False,
         gcc: CompilerExe | None = None,
         clang: CompilerExe | None = None,
         ccomp: CComp | None = None,
+        ccache: Path | None = None,
         check_warnings_opt_level: OptLevel = OptLevel.O3,
         sanitizer_opt_level: OptLevel = OptLevel.O0,
         checked_warnings: tuple[str, ...] | None = None,
@@ -169,6 +365,11 @@ class Sanitizer:
         compilation_timeout: int = 8,
         execution_timeout: int = 4,
         ccomp_timeout: int = 16,
+        cache_dir: Path | None = None,
+        max_exe_cache_size: int = 1 << 30,
+        max_checks_cache_size: int = 64 << 20,
+        tmp_dir: Path | None = None,
+        early_sanitizer_builds: bool = False,
         debug: bool = False,
     ):
         """
@@ -182,6 +383,9 @@ class Sanitizer:
                 whether to use clang's memory sanitizer
             use_ccomp_if_available (bool | None):
                 if ccomp should be used, if ccomp is not None this argument is ignored
+            use_ccache_if_available (bool):
+                if ccache should be used for the compiler warnings checks, if
+                ccache is not None this argument is ignored
             gcc (CompilerExe | None):
                 the gcc executable to use, if not provided
                 CompilerExe.get_system_gcc will be used
@@ -191,6 +395,10 @@ class Sanitizer:
             ccomp (CComp | None):
                 the ccomp executable to use, if not provided and use_ccomp
                 is True CComp.get_system_ccomp will be used if available
+            ccache (Path | None):
+                the ccache executable to use, if not provided and
+                use_ccache_if_available is True the one in PATH will
+                be used if available
             check_warnings_opt_level (OptLevel):
                 which optimization level to use when checking
                 for compiler warnings
@@ -210,6 +418,31 @@ class Sanitizer:
                 (relevant for use_ub_sanitizer)
             ccomp_timeout (int):
                 after how many seconds to abort interpreting with ccomp and fail
+            cache_dir (Path | None):
+                if not None, results of Sanitizer.sanitize are cached in this
+                directory and reused for identical programs, the instrumented
+                binaries are cached as well and reused when only the checks
+                around them changed. Headers included from the programs'
+                include paths are not part of the cache keys, the cache must
+                be cleared if they change.
+            max_exe_cache_size (int):
+                the maximum total size in bytes of the cached instrumented
+                binaries, the least recently used ones are removed first
+            max_checks_cache_size (int):
+                the approximate maximum total size in bytes of the cached
+                sanitization results, the least recently used ones are
+                removed first
+            tmp_dir (Path | None):
+                where to create the temporary files used while sanitizing,
+                e.g., a tmpfs mount to avoid disk I/O; it must allow executing
+                files if the sanitizers are used. If None the default
+                temporary directory is used.
+            early_sanitizer_builds (bool):
+                if True, sanitize starts building the instrumented binaries
+                while the compiler warnings are checked. This saves time for
+                programs that pass the warnings checks but wastes the builds
+                of those that don't, so it is only worth it if most programs
+                pass and there are idle cores.
             debug (bool):
                 if True then additional info is printed when sanitizing programs
         """
@@ -218,10 +451,19 @@ class Sanitizer:
         self.ccomp = ccomp
         if use_ccomp_if_available and not self.ccomp:
             self.ccomp = CComp.get_system_ccomp()
+        self.ccache = ccache
+        if use_ccache_if_available and not self.ccache:
+            if system_ccache := which("ccache"):
+                self.ccache = Path(system_ccache)
+        self.checked_warnings: tuple[str, ...] = ()
         if checked_warnings:
             self.checked_warnings = checked_warnings
         elif check_warnings:
             self.checked_warnings = Sanitizer.default_warnings
+        self.checked_warnings_pattern = compile_warnings_pattern(self.checked_warnings)
+        self.checked_warnings_bytes = tuple(
+            dict.fromkeys(warning.encode("utf-8") for warning in self.checked_warnings)
+        )
         self.use_ub_address_sanitizer = use_ub_address_sanitizer
         self.use_memory_sanitizer = use_memory_sanitizer
         self.check_warnings_opt_level = check_warnings_opt_level
@@ -229,6 +471,11 @@ class Sanitizer:
         self.compilation_timeout = compilation_timeout
         self.execution_timeout = execution_timeout
         self.ccomp_timeout = ccomp_timeout
+        self.cache_dir = cache_dir
+        self.max_exe_cache_size = max_exe_cache_size
+        self.max_checks_cache_size = max_checks_cache_size
+        self.tmp_dir = tmp_dir
+        self.early_sanitizer_builds = early_sanitizer_builds
         self.debug = debug
         self.use_gnu2x = (
             use_gnu2x_if_available
@@ -252,67 +499,209 @@ class Sanitizer:
                 whether the program failed sanitization or not.
         """
 
-        def check_warnings_impl(comp: CompilationSetting) -> SanitizationResult:
+        with TempDirEnv(dir=self.tmp_dir) as tmpdir:
+            source = write_source_file(program, tmpdir)
+            # gcc and clang are independent, run them concurrently
+            # under a shared deadline
+            deadline = time.monotonic() + self.compilation_timeout
+            pending = [
+                self.launch_warnings_check(source, compiler, tmpdir)
+                for compiler in (self.gcc, self.clang)
+            ]
             try:
-                result = comp.compile_program(
-                    program,
-                    ObjectCompilationOutput(Path("/dev/null")),
-                    (
-                        "-Wall",
-                        "-Wextra",
-                        "-Wpedantic",
-                        "-Wno-builtin-declaration-mismatch",
-                    )
-                    + (
-                        ("--std=gnu2x",)
-                        if self.use_gnu2x and program.language == Language.C
-                        else ()
-                    ),
-                    timeout=self.compilation_timeout,
-                )
-            except subprocess.TimeoutExpired:
-                return SanitizationResult(timeout=True)
-            except CompileError as e:
-                if self.debug:
-                    print(e)
-                return SanitizationResult(check_warnings_failed=True)
-            warnings: set[str] = set()
-            for line in result.stdout_stderr_output.splitlines():
-                for checked_warning in self.checked_warnings:
-                    if checked_warning in line:
-                        if self.debug:
-                            warnings.add(checked_warning)
-                        else:
-                            return SanitizationResult(check_warnings_failed=True)
-            if self.debug and warnings:
-                print("Warnings found:", "|".join(warnings))
-                return SanitizationResult(check_warnings_failed=True)
-            return SanitizationResult()
+                return self.collect_warnings_checks(pending, deadline)
+            finally:
+                for compilation in pending:
+                    compilation.kill()
 
-        with TempDirEnv():
-            if not (
-                gcc_result := check_warnings_impl(
-                    CompilationSetting(
-                        compiler=self.gcc,
-                        opt_level=self.check_warnings_opt_level,
-                    )
-                )
-            ):
-                return gcc_result
-            if not (
-                clang_result := check_warnings_impl(
-                    CompilationSetting(
-                        compiler=self.clang,
-                        opt_level=self.check_warnings_opt_level,
-                    )
+    def launch_warnings_check(
+        self, program: Source, compiler: CompilerExe, tmpdir: Path
+    ) -> AsyncCompilationResult[ObjectCompilationOutput]:
+        """Starts compiling the program with warnings enabled in a subprocess.
+
+        Args:
+            program (Source):
+                The program to check.
+            compiler (CompilerExe):
+                The compiler whose warnings will be checked.
+            tmpdir (Path):
+                where the compiler may create temporary files
+
+        Returns:
+            AsyncCompilationResult[ObjectCompilationOutput]:
+                the pending compilation, to be passed to `collect_warnings_checks`
+        """
+        output = ObjectCompilationOutput(Path("/dev/null"))
+        launcher: tuple[str, ...] = ()
+        working_dir = None
+        env = {"TMPDIR": str(tmpdir)}
+        if self.ccache and isinstance(program, SourceFile):
+            # ccache does not cache compilations that write to /dev/null and
+            # hashes the source path, so compile next to the source and let
+            # ccache rewrite the paths relative to it. Relative paths in the
+            # command would then point into the wrong directory.
+            tmpdir = tmpdir.resolve()
+            program = replace(
+                program,
+                filename=program.filename.resolve(),
+                include_paths=tuple(map(os.path.abspath, program.include_paths)),
+                system_include_paths=tuple(
+                    map(os.path.abspath, program.system_include_paths)
+                ),
+            )
+            compiler = replace(compiler, exe=absolute_exe(compiler.exe))
+            working_dir = program.filename.parent
+            output = ObjectCompilationOutput(
+                tmpdir / f"{compiler.project.to_string()}.o"
+            )
+            launcher = (str(absolute_exe(self.ccache)),)
+            env["TMPDIR"] = str(tmpdir)
+            env["CCACHE_BASEDIR"] = str(working_dir)
+            env["CCACHE_SLOPPINESS"] = "pch_defines,time_macros"
+            if self.cache_dir:
+                env["CCACHE_DIR"] = str(self.cache_dir.absolute() / "ccache")
+        return CompilationSetting(
+            compiler=compiler,
+            opt_level=self.check_warnings_opt_level,
+        ).compile_program_async(
+            program,
+            output,
+            (
+                "-Wall",
+                "-Wextra",
+                "-Wpedantic",
+                "-Wno-builtin-declaration-mismatch",
+            )
+            + (
+                ("--std=gnu2x",)
+                if self.use_gnu2x and program.language == Language.C
+                else ()
+            ),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            launcher=launcher,
+            working_dir=working_dir,
+            additional_env=env,
+        )
+
+    def collect_warnings_checks(
+        self,
+        compilations: list[AsyncCompilationResult[ObjectCompilationOutput]],
+        deadline: float,
+    ) -> SanitizationResult:
+        """Waits for compilations started by `launch_warnings_check` and
+        checks their outputs for any of self.checked_warnings.
+
+        All outputs are read in a single loop as they are produced, so no
+        compiler stalls on a full pipe while another one is being read.
+        The check fails as soon as any compilation fails or a warning is
+        found in any output, without waiting for the other compilers.
+        Failures detected at the same time are reported in the order of
+        `compilations`. Unless self.debug is set, only a bounded window of
+        each output is kept in memory.
+
+        Args:
+            compilations (list[AsyncCompilationResult[ObjectCompilationOutput]]):
+                the pending compilations
+            deadline (float):
+                `time.monotonic()` value after which the compilations time out
+
+        Returns:
+            SanitizationResult:
+                whether the program failed sanitization or not.
+        """
+        warnings = self.checked_warnings_bytes
+        # keep enough of the previous chunk to match a warning split
+        # across two chunks
+        overlap = max(map(len, warnings), default=0)
+        windows = [b""] * len(compilations)
+        outputs = [bytearray() for _ in compilations]
+        with selectors.DefaultSelector() as selector:
+            for i, compilation in enumerate(compilations):
+                assert compilation.proc.stdout is not None
+                selector.register(
+                    compilation.proc.stdout.fileno(), selectors.EVENT_READ, i
                 )
-            ):
-                return clang_result
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return SanitizationResult(timeout=True)
+                events = selector.select(remaining)
+                if not events:
+                    return SanitizationResult(timeout=True)
+                for key, _ in sorted(events, key=lambda event: event[0].data):
+                    i = key.data
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        # the compiler closed its output, it is (about to be) done
+                        selector.unregister(key.fd)
+                        if not (
+                            result := self.finish_warnings_check(
+                                compilations[i], outputs[i], deadline
+                            )
+                        ):
+                            return result
+                        continue
+                    if self.debug:
+                        outputs[i] += chunk
+                        continue
+                    if not warnings:
+                        continue
+                    windows[i] = windows[i][-overlap:] + chunk
+                    # Only the presence of a warning matters here. Searching
+                    # for each literal with `in` is a few times faster than
+                    # the combined pattern, which is only used for reporting.
+                    if any(warning in windows[i] for warning in warnings):
+                        return SanitizationResult(check_warnings_failed=True)
+        return SanitizationResult()
 
+    def finish_warnings_check(
+        self,
+        compilation: AsyncCompilationResult[ObjectCompilationOutput],
+        output: bytes | bytearray,
+        deadline: float,
+    ) -> SanitizationResult:
+        """Waits for a compilation whose output has been read completely
+        and reports whether it failed.
+
+        Args:
+            compilation (AsyncCompilationResult[ObjectCompilationOutput]):
+                the compilation
+            output (bytes | bytearray):
+                the compilation's output, only collected if self.debug is set
+            deadline (float):
+                `time.monotonic()` value after which the compilation times out
+
+        Returns:
+            SanitizationResult:
+                whether the program failed sanitization or not.
+        """
+        pattern = self.checked_warnings_pattern
+        try:
+            compilation.wait(timeout=max(0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            return SanitizationResult(timeout=True)
+        if compilation.proc.returncode != 0:
+            if self.debug:
+                print(compilation.cmd)
+                print(output.decode("utf-8", errors="replace"))
+            return SanitizationResult(check_warnings_failed=True)
+        if not (self.debug and pattern):
+            return SanitizationResult()
+        found = set(warning.decode("utf-8") for warning in pattern.findall(output))
+        if found:
+            print("Warnings found:", "|".join(found))
+            return SanitizationResult(check_warnings_failed=True)
         return SanitizationResult()
 
     def check_for_sanitizer_errors(
-        self, program: SourceProgram, sanitizer_flag: str
+        self,
+        program: SourceProgram,
+        sanitizer_flag: str,
+        build: (
+            AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput | None
+        ) = None,
+        build_deadline: float | None = None,
     ) -> SanitizationResult:
         """Checks the program for UB, address, or memory sanitizer errors.
 
@@ -325,30 +714,163 @@ class Sanitizer:
                 The program to check.
             sanitizer_flag (str):
                 the flag to pass to clang to enable the sanitizer
+            build (AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput
+                | None):
+                if not None, the compilation of program already started with
+                `launch_sanitizer_build`, it is used instead of compiling again
+            build_deadline (float | None):
+                `time.monotonic()` value after which build times out,
+                required if build is not None
         Returns:
             SanitizationResult:
                 whether the program failed sanitization or not.
         """
 
-        with TempDirEnv():
-            # Compile program with -fsanitize=...
+        exe_cache_path = self.sanitizer_exe_cache_path(program, sanitizer_flag)
+        with TempDirEnv(dir=self.tmp_dir) as tmpdir:
+            if build is None:
+                build = self.launch_sanitizer_build(
+                    write_source_file(program, tmpdir),
+                    sanitizer_flag,
+                    tmpdir,
+                    exe_cache_path,
+                )
+                build_deadline = time.monotonic() + self.compilation_timeout
+            assert build_deadline is not None
             try:
-                result = CompilationSetting(
-                    compiler=self.clang,
-                    opt_level=self.sanitizer_opt_level,
-                ).compile_program(
-                    program,
-                    ExeCompilationOutput(None),
-                    (
-                        "-Wall",
-                        "-Wextra",
-                        "-Wpedantic",
-                        "-Wno-builtin-declaration-mismatch",
-                        "-fsanitize=" + sanitizer_flag,
-                        "-fno-sanitize-recover=all",
-                    ),
-                    timeout=self.compilation_timeout,
+                return self.collect_sanitizer_check(
+                    build, build_deadline, exe_cache_path
                 )
+            finally:
+                if isinstance(build, AsyncCompilationResult):
+                    build.kill()
+
+    def launch_sanitizer_build(
+        self,
+        program: Source,
+        sanitizer_flag: str,
+        tmpdir: Path,
+        exe_cache_path: Path | None = None,
+    ) -> AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput:
+        """Starts compiling the program with -fsanitize=`sanitizer_flag`
+        in a subprocess.
+
+        Args:
+            program (Source):
+                The program to check.
+            sanitizer_flag (str):
+                the flag to pass to clang to enable the sanitizer
+            tmpdir (Path):
+                where to write the instrumented binary and where the
+                compiler may create temporary files
+            exe_cache_path (Path | None):
+                where the binary is cached, see `sanitizer_exe_cache_path`
+
+        Returns:
+            AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput:
+                the pending compilation, or the cached binary if there is one,
+                to be passed to `collect_sanitizer_check`
+        """
+        exe = tmpdir / f"{sanitizer_flag.replace(',', '-')}.exe"
+        if exe_cache_path:
+            try:
+                # link instead of running the cached binary directly,
+                # so that evicting it can't affect this check
+                os.link(exe_cache_path, exe)
+                os.utime(exe_cache_path)
+                return ExeCompilationOutput(exe)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # e.g., tmpdir and the cache are on different filesystems,
+                # if copying fails as well just build the binary
+                try:
+                    copy2(exe_cache_path, exe)
+                    os.utime(exe_cache_path)
+                    return ExeCompilationOutput(exe)
+                except OSError:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(exe)
+        return CompilationSetting(
+            compiler=self.clang,
+            opt_level=self.sanitizer_opt_level,
+        ).compile_program_async(
+            program,
+            ExeCompilationOutput(exe),
+            (
+                "-Wall",
+                "-Wextra",
+                "-Wpedantic",
+                "-Wno-builtin-declaration-mismatch",
+                "-fsanitize=" + sanitizer_flag,
+                "-fno-sanitize-recover=all",
+            ),
+            # Nothing reads the output before the build is waited for, a
+            # pipe would fill up and stall a chatty build until then. The
+            # output is only needed to report errors when debugging.
+            stdout=subprocess.PIPE if self.debug else subprocess.DEVNULL,
+            stderr=subprocess.PIPE if self.debug else subprocess.DEVNULL,
+            additional_env={"TMPDIR": str(tmpdir)},
+        )
+
+    def collect_sanitizer_check(
+        self,
+        build: AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput,
+        deadline: float,
+        exe_cache_path: Path | None = None,
+    ) -> SanitizationResult:
+        """Waits for a compilation started by `launch_sanitizer_build`, then
+        runs the instrumented binary and reports whether it failed.
+
+        Args:
+            build (AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput):
+                the pending compilation or the cached binary
+            deadline (float):
+                `time.monotonic()` value after which the compilation times out
+            exe_cache_path (Path | None):
+                if not None, where to cache the built binary
+
+        Returns:
+            SanitizationResult:
+                whether the program failed sanitization or not.
+        """
+        run = self.launch_sanitized_run(build, deadline, exe_cache_path)
+        if isinstance(run, SanitizationResult):
+            return run
+        try:
+            return self.collect_sanitized_run(
+                run, time.monotonic() + self.execution_timeout
+            )
+        finally:
+            kill_process(run)
+
+    def launch_sanitized_run(
+        self,
+        build: AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput,
+        deadline: float,
+        exe_cache_path: Path | None = None,
+    ) -> Popen[str] | SanitizationResult:
+        """Waits for a compilation started by `launch_sanitizer_build` and
+        starts running the instrumented binary in a subprocess.
+
+        Args:
+            build (AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput):
+                the pending compilation or the cached binary
+            deadline (float):
+                `time.monotonic()` value after which the compilation times out
+            exe_cache_path (Path | None):
+                if not None, where to cache the built binary
+
+        Returns:
+            Popen[str] | SanitizationResult:
+                the running binary, to be passed to `collect_sanitized_run`,
+                or the failed result if the compilation failed or timed out
+        """
+        if isinstance(build, ExeCompilationOutput):
+            exe = build.filename
+        else:
+            try:
+                result = build.result(timeout=max(0, deadline - time.monotonic()))
             except subprocess.TimeoutExpired:
                 if self.debug:
                     print("Compilation timed out")
@@ -357,28 +879,56 @@ class Sanitizer:
                 if self.debug:
                     print(e)
                 return SanitizationResult(sanitizer_failed=True)
+            exe = result.output.filename
+            if exe_cache_path:
+                self.cache_sanitizer_exe(exe, exe_cache_path)
 
-            # Run the instrumented binary
-            try:
-                run_cmd(
-                    str(result.output.filename),
-                    timeout=self.execution_timeout,
-                    additional_env={
-                        "ASAN_OPTIONS": "detect_stack_use_after_return=1",
-                    },
-                )
-            except subprocess.TimeoutExpired:
-                if self.debug:
-                    print("Compilation timed out")
-                return SanitizationResult(timeout=True)
-            except subprocess.CalledProcessError as e:
-                if self.debug:
-                    print(e.stdout)
-                    print(e.stderr)
-                return SanitizationResult(sanitizer_failed=True)
+        # the output is only inspected when debugging
+        output = subprocess.PIPE if self.debug else subprocess.DEVNULL
+        return run_cmd_async(
+            [str(exe)],
+            additional_env={
+                "ASAN_OPTIONS": "detect_stack_use_after_return=1",
+            },
+            text=True,
+            stdin=subprocess.DEVNULL,
+            stdout=output,
+            stderr=output,
+            new_session=True,
+        )
+
+    def collect_sanitized_run(
+        self, run: Popen[str], deadline: float
+    ) -> SanitizationResult:
+        """Waits for a binary started by `launch_sanitized_run`
+        and reports whether it failed.
+
+        Args:
+            run (Popen[str]):
+                the running instrumented binary
+            deadline (float):
+                `time.monotonic()` value after which the execution times out
+
+        Returns:
+            SanitizationResult:
+                whether the program failed sanitization or not.
+        """
+        try:
+            stdout, stderr = run.communicate(
+                timeout=max(0, deadline - time.monotonic())
+            )
+        except subprocess.TimeoutExpired:
             if self.debug:
-                print("Sanitizer checks passed")
-            return SanitizationResult()
+                print("Execution timed out")
+            return SanitizationResult(timeout=True)
+        if run.returncode != 0:
+            if self.debug:
+                print(stdout)
+                print(stderr)
+            return SanitizationResult(sanitizer_failed=True)
+        if self.debug:
+            print("Sanitizer checks passed")
+        return SanitizationResult()
 
     def check_for_ccomp_errors(
         self, program: SourceProgram
@@ -401,9 +951,11 @@ class Sanitizer:
             if self.debug:
                 print("CComp not available, skipping")
             return None
-        with TempDirEnv():
+        with TempDirEnv(dir=self.tmp_dir) as tmpdir:
             try:
-                if not self.ccomp.check_program(program, timeout=self.ccomp_timeout):
+                if not self.ccomp.check_program(
+                    program, timeout=self.ccomp_timeout, tmpdir=tmpdir
+                ):
                     if self.debug:
                         print("CComp failed")
                     return SanitizationResult(ccomp_failed=True)
@@ -421,6 +973,9 @@ class Sanitizer:
         self.use_ub_address_sanitizer, self.use_memory_sanitizer and self.ccomp.
         It reports if any of them failed or if some check timed out.
 
+        If self.cache_dir is set, results are cached on disk keyed by the
+        program and the sanitizer's configuration. Timeouts are not cached.
+
         Args:
             program (SourceProgram):
                 The program to check.
@@ -429,25 +984,258 @@ class Sanitizer:
             SanitizationResult:
                 Whether the program failed sanitization or not.
         """
+        if self.cache_dir is None:
+            return self.sanitize_impl(program)
+
+        cache_file = self.cache_dir / "checks" / f"{self.cache_key(program)}.json"
+        try:
+            with open(cache_file, "r") as f:
+                result = SanitizationResult.from_json_dict(json.load(f))
+            # mark the entry as recently used for evict_least_recently_used
+            with contextlib.suppress(OSError):
+                os.utime(cache_file)
+            return result
+        except (OSError, ValueError, KeyError):
+            pass
 
-        if self.checked_warnings and not (
-            check_warnings_result := self.check_for_compiler_warnings(program)
-        ):
-            return check_warnings_result
+        result = self.sanitize_impl(program)
+        if not result.timeout:
+            self.cache_result(result, cache_file)
+        return result
 
-        if self.use_ub_address_sanitizer and not (
-            sanitizer_result := self.check_for_sanitizer_errors(
-                program, sanitizer_flag="undefined,address"
+    def cache_result(self, result: SanitizationResult, cache_file: Path) -> None:
+        """Stores a sanitization result at `cache_file` and evicts the least
+        recently used results if the cache grows too large.
+
+        Caching is best effort, failures are ignored.
+
+        Args:
+            result (SanitizationResult):
+                the result to cache
+            cache_file (Path):
+                where to store it
+        """
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # write then rename such that concurrent readers
+            # never see a partially written file, the "." prefix
+            # keeps the partial file from being evicted
+            tf = tempfile.NamedTemporaryFile(
+                "w", dir=cache_file.parent, prefix=".", delete=False
             )
-        ):
-            return sanitizer_result
+        except OSError:
+            return
+        try:
+            with tf:
+                json.dump(result.to_json_dict(), tf)
+            os.replace(tf.name, cache_file)
+        except OSError:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tf.name)
+            return
+        # There is one small file per distinct program, so scanning the
+        # directory after every write would dominate. The keys are uniformly
+        # distributed hex digests, trim the cache after ~1/256th of them.
+        if cache_file.stem.endswith("00"):
+            evict_least_recently_used(cache_file.parent, self.max_checks_cache_size)
+
+    def sanitize_all(
+        self, programs: Iterable[SourceProgram], executor: Executor
+    ) -> SanitizationResult:
+        """Sanitizes multiple programs in parallel.
 
-        if self.use_memory_sanitizer and not (
-            sanitizer_result := self.check_for_sanitizer_errors(
-                program, sanitizer_flag="memory"
+        Stops at the first program that fails and cancels the checks that
+        have not started yet. Duplicate programs are only checked once.
+
+        Example:
+        with ProcessPoolExecutor(16) as executor:
+            if not sanitizer.sanitize_all(programs, executor):
+                # at least one program is broken
+
+        Args:
+            programs (Iterable[SourceProgram]):
+                The programs to check.
+            executor (Executor):
+                executor used for running the checks, a ProcessPoolExecutor
+                avoids contention on the GIL
+
+        Returns:
+            SanitizationResult:
+                successful if all programs passed sanitization, otherwise
+                the result of the first failing program to complete
+        """
+        # the result only depends on the program, so there is no
+        # point in checking the same one more than once
+        futures = [
+            executor.submit(self.sanitize, program)
+            for program in dict.fromkeys(programs)
+        ]
+        try:
+            for future in as_completed(futures):
+                if not (result := future.result()):
+                    return result
+        finally:
+            for future in futures:
+                future.cancel()
+        return SanitizationResult()
+
+    def cache_key(self, program: SourceProgram) -> str:
+        """Computes the key under which the sanitization result of
+        `program` is cached.
+
+        The key covers the program's code and flags, this sanitizer's
+        configuration, and the identity of the tools it runs. It does not
+        cover headers included from the program's include paths.
+
+        Args:
+            program (SourceProgram):
+                The program to check.
+
+        Returns:
+            str:
+                the hex digest of the key
+        """
+        configuration = {
+            "language": program.language.name,
+            "flags": program.get_compilation_flags(),
+            "checked_warnings": self.checked_warnings,
+            "use_ub_address_sanitizer": self.use_ub_address_sanitizer,
+            "use_memory_sanitizer": self.use_memory_sanitizer,
+            "check_warnings_opt_level": self.check_warnings_opt_level.name,
+            "sanitizer_opt_level": self.sanitizer_opt_level.name,
+            "use_gnu2x": self.use_gnu2x,
+            "compilation_timeout": self.compilation_timeout,
+            "execution_timeout": self.execution_timeout,
+            "ccomp_timeout": self.ccomp_timeout,
+            "gcc": tool_fingerprint(self.gcc.exe),
+            "clang": tool_fingerprint(self.clang.exe),
+            "ccomp": tool_fingerprint(self.ccomp.exe) if self.ccomp else None,
+        }
+        h = hashlib.blake2b(digest_size=32)
+        h.update(json.dumps(configuration, sort_keys=True).encode("utf-8"))
+        h.update(program.get_modified_code().encode("utf-8"))
+        return h.hexdigest()
+
+    def sanitizer_exe_cache_path(
+        self, program: SourceProgram, sanitizer_flag: str
+    ) -> Path | None:
+        """Where the binary instrumented with `sanitizer_flag` is cached.
+
+        The path is derived from everything that affects the binary: the
+        program's code and flags, the sanitizer and the clang used.
+
+        Args:
+            program (SourceProgram):
+                The program to check.
+            sanitizer_flag (str):
+                the flag passed to clang to enable the sanitizer
+
+        Returns:
+            Path | None:
+                the path of the cached binary (which may not exist yet),
+                None if caching is disabled
+        """
+        if self.cache_dir is None:
+            return None
+        configuration = {
+            "language": program.language.name,
+            "flags": program.get_compilation_flags(),
+            "sanitizer_flag": sanitizer_flag,
+            "sanitizer_opt_level": self.sanitizer_opt_level.name,
+            "clang": tool_fingerprint(self.clang.exe),
+        }
+        h = hashlib.blake2b(digest_size=32)
+        h.update(json.dumps(configuration, sort_keys=True).encode("utf-8"))
+        h.update(program.get_modified_code().encode("utf-8"))
+        return self.cache_dir / "sanitized" / h.hexdigest()
+
+    def cache_sanitizer_exe(self, exe: Path, exe_cache_path: Path) -> None:
+        """Stores an instrumented binary at `exe_cache_path` and evicts the
+        least recently used binaries if the cache grows too large.
+
+        Caching is best effort, failures are ignored.
+
+        Args:
+            exe (Path):
+                the binary to cache
+            exe_cache_path (Path):
+                where to store it, see `sanitizer_exe_cache_path`
+        """
+        try:
+            exe_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # copy then rename such that concurrent readers
+            # never see a partially written binary, the "." prefix
+            # keeps the partial copy from being evicted
+            tf = tempfile.NamedTemporaryFile(
+                dir=exe_cache_path.parent, prefix=".", delete=False
             )
-        ):
-            return sanitizer_result
+        except OSError:
+            return
+        try:
+            with tf, open(exe, "rb") as f:
+                copyfileobj(f, tf)
+            os.chmod(tf.name, 0o755)
+            os.replace(tf.name, exe_cache_path)
+        except OSError:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tf.name)
+            return
+        evict_least_recently_used(exe_cache_path.parent, self.max_exe_cache_size)
+
+    def sanitize_impl(self, program: SourceProgram) -> SanitizationResult:
+        """Runs all the enabled sanitization checks without consulting the cache.
+
+        Args:
+            program (SourceProgram):
+                The program to check.
+
+        Returns:
+            SanitizationResult:
+                Whether the program failed sanitization or not.
+        """
+
+        sanitizer_flags = (
+            ("undefined,address",) if self.use_ub_address_sanitizer else ()
+        ) + (("memory",) if self.use_memory_sanitizer else ())
+
+        with TempDirEnv(dir=self.tmp_dir) as tmpdir:
+            builds: dict[
+                str, AsyncCompilationResult[ExeCompilationOutput] | ExeCompilationOutput
+            ] = {}
+            build_deadline = None
+            try:
+                if self.early_sanitizer_builds and sanitizer_flags:
+                    # the builds are independent of the warnings checks,
+                    # compile them in the meantime
+                    source = write_source_file(program, tmpdir)
+                    build_deadline = time.monotonic() + self.compilation_timeout
+                    for sanitizer_flag in sanitizer_flags:
+                        builds[sanitizer_flag] = self.launch_sanitizer_build(
+                            source,
+                            sanitizer_flag,
+                            tmpdir,
+                            self.sanitizer_exe_cache_path(program, sanitizer_flag),
+                        )
+
+                if self.checked_warnings and not (
+                    check_warnings_result := self.check_for_compiler_warnings(program)
+                ):
+                    return check_warnings_result
+
+                for sanitizer_flag in sanitizer_flags:
+                    if not (
+                        sanitizer_result := self.check_for_sanitizer_errors(
+                            program,
+                            sanitizer_flag,
+                            builds.get(sanitizer_flag),
+                            build_deadline,
+                        )
+                    ):
+                        return sanitizer_result
+            finally:
+                for build in builds.values():
+                    if isinstance(build, AsyncCompilationResult):
+                        build.kill()
 
         if self.ccomp and not (ccomp_result := self.check_for_ccomp_errors(program)):
             assert ccomp_result is not None
@@ -1,5 +1,7 @@
+import contextlib
 import os
 import shlex
+import signal
 import subprocess
 import tempfile
 from dataclasses import dataclass
@@ -14,31 +16,132 @@ class CommandOutput:
     stderr: str
 
 
+def output_file() -> IO[bytes]:
+    """Creates an anonymous file to capture a subprocess' output in.
+
+    Unlike a pipe, the file never fills up and stalls the subprocess and
+    the whole output can be read at once after it exits. An in-memory
+    file (memfd) is used where available, a temporary file otherwise.
+
+    Returns:
+        IO[bytes]:
+            the file, it is removed when closed
+    """
+    if hasattr(os, "memfd_create"):
+        return os.fdopen(os.memfd_create("output", os.MFD_CLOEXEC), "w+b")
+    return tempfile.TemporaryFile()
+
+
+def read_output_file(f: IO[bytes]) -> bytes:
+    """Reads everything a subprocess wrote in a file from `output_file`.
+
+    Args:
+        f (IO[bytes]):
+            the file
+
+    Returns:
+        bytes:
+            the file's contents
+    """
+    f.seek(0)
+    return f.read()
+
+
 def run_cmd(
     cmd: Union[str, list[str]],
     working_dir: Path | None = None,
     additional_env: dict[str, str] = {},
+    capture: bool = True,
+    timeout: float | None = None,
+    new_session: bool = False,
+    input: bytes | None = None,
     **kwargs: Any,  # https://github.com/python/mypy/issues/8772
 ) -> CommandOutput:
-    if working_dir is None:
-        working_dir = Path(os.getcwd())
+    """Runs cmd and waits for it to finish.
+
+    With new_session, cmd runs in its own process group which is killed
+    as a whole on timeout (or any other error) such that no grandchildren,
+    e.g., the cc1 spawned by a compiler driver, are left running.
+
+    The process group is created with start_new_session rather than a
+    preexec_fn: without a preexec_fn CPython starts the process with
+    vfork, which, like posix_spawn, does not copy the parent's page
+    tables. Keep it that way, forking a large process for every
+    compiler invocation is measurably slower.
+
+    Args:
+        cmd (str | list[str]):
+            the command to run, strings are split with shlex while lists
+            are passed to the process unchanged
+        working_dir (Path | None):
+            where to run the command, the current directory if None
+        additional_env (dict[str, str]):
+            environment variables to set in addition to the current environment
+        capture (bool):
+            whether to capture stdout and stderr (in files from
+            `output_file`), if False the output is discarded and
+            empty strings are returned
+        timeout (float | None):
+            seconds to wait for cmd before killing it
+        new_session (bool):
+            whether to run cmd in a new session (and process group), this
+            detaches it from the controlling terminal, so commands that may
+            prompt the user, e.g., git, should not use it
+        input (bytes | None):
+            if not None, passed to cmd's stdin (like subprocess.run's input)
+        kwargs:
+            passed to subprocess.Popen
+    Returns:
+        CommandOutput:
+            the captured stdout and stderr
+
+    Raises:
+        subprocess.TimeoutExpired:
+            if cmd did not finish within timeout
+        subprocess.CalledProcessError:
+            if cmd exited with a non-zero code
+    """
     env = os.environ.copy()
     env.update(additional_env)
 
-    if isinstance(cmd, list):
-        cmd = " ".join(cmd)
-    output = subprocess.run(
-        shlex.split(cmd.replace('"', '\\"')),
-        cwd=str(working_dir),
-        check=True,
-        env=env,
-        capture_output=True,
-        **kwargs,
-    )
+    # lists are used as is, splitting them again would break
+    # arguments that contain spaces, e.g., paths
+    if isinstance(cmd, str):
+        cmd = shlex.split(cmd.replace('"', '\\"'))
+    with contextlib.ExitStack() as stack:
+        if input is not None:
+            if "stdin" in kwargs:
+                raise ValueError("stdin and input arguments may not both be used.")
+            # like the output, the input goes through a file instead of a pipe
+            kwargs["stdin"] = stack.enter_context(output_file())
+            kwargs["stdin"].write(input)
+            kwargs["stdin"].seek(0)
+        stdout_file = stack.enter_context(output_file()) if capture else None
+        stderr_file = stack.enter_context(output_file()) if capture else None
+        with subprocess.Popen(
+            cmd,
+            cwd=working_dir,
+            env=env,
+            stdout=stdout_file if stdout_file else subprocess.DEVNULL,
+            stderr=stderr_file if stderr_file else subprocess.DEVNULL,
+            start_new_session=new_session,
+            **kwargs,
+        ) as proc:
+            try:
+                proc.wait(timeout=timeout)
+            except BaseException:
+                kill_process(proc)
+                raise
+        stdout = read_output_file(stdout_file) if stdout_file else None
+        stderr = read_output_file(stderr_file) if stderr_file else None
 
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args, stdout, stderr)
+    if stdout is None or stderr is None:
+        return CommandOutput(stdout="", stderr="")
     return CommandOutput(
-        stdout=output.stdout.decode("utf-8").strip(),
-        stderr=output.stderr.decode("utf-8").strip(),
+        stdout=stdout.decode("utf-8").strip(),
+        stderr=stderr.decode("utf-8").strip(),
     )
 
 
@@ -48,61 +151,87 @@ def run_cmd_async(
     additional_env: dict[str, str] = {},
     stdout: IO[str] | int | None = subprocess.PIPE,
     stderr: IO[str] | int | None = subprocess.PIPE,
+    new_session: bool = False,
     **kwargs: Any,
 ) -> subprocess.Popen[Any]:
-    if working_dir is None:
-        working_dir = Path(os.getcwd())
     env = os.environ.copy()
     env.update(additional_env)
 
-    if isinstance(cmd, list):
-        cmd = " ".join(cmd)
+    if isinstance(cmd, str):
+        cmd = shlex.split(cmd.replace('"', '\\"'))
 
+    # with new_session kill_process can also kill any subprocesses
+    # spawned by cmd, see run_cmd on when to use it and why this
+    # must not be done with a preexec_fn
     return subprocess.Popen(
-        shlex.split(cmd.replace('"', '\\"')),
-        cwd=str(working_dir),
+        cmd,
+        cwd=working_dir,
         env=env,
         stdout=stdout,
         stderr=stderr,
+        start_new_session=new_session,
         **kwargs,
     )
 
 
+def kill_process(proc: subprocess.Popen[Any]) -> None:
+    """Kills the process, and its process group if it leads one,
+    if it is still running and reaps it.
+
+    Args:
+        proc (subprocess.Popen[Any]):
+            the process to kill
+    """
+    if proc.poll() is None:
+        try:
+            # compiler drivers spawn subprocesses (cc1, as, ...),
+            # kill the whole process group if there is one
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            proc.kill()
+        proc.wait()
+
+
 def run_cmd_to_logfile(
     cmd: Union[str, list[str]],
     log_file: TextIO | None = None,
     working_dir: Path | None = None,
     additional_env: dict[str, str] = {},
 ) -> None:
-    if working_dir is None:
-        working_dir = Path(os.getcwd())
     env = os.environ.copy()
     env.update(additional_env)
 
-    if isinstance(cmd, list):
-        cmd = " ".join(cmd)
+    if isinstance(cmd, str):
+        cmd = shlex.split(cmd)
 
     subprocess.run(
-        shlex.split(cmd),
+        cmd,
         cwd=working_dir,
         check=True,
         stdout=log_file,
         stderr=subprocess.STDOUT,
         env=env,
-        capture_output=False,
     )
 
 
 class TempDirEnv:
-    def __init__(self, change_dir: bool = False) -> None:
+    def __init__(self, change_dir: bool = False, dir: Path | None = None) -> None:
+        """
+        Args:
+            change_dir (bool):
+                whether to change the working directory to the temporary directory
+            dir (Path | None):
+                where to create the temporary directory, e.g., on a tmpfs mount,
+                if None the default location is used
+        """
         self.td: tempfile.TemporaryDirectory[str]
         self.old_dir: Path
 
         self.chdir = change_dir
+        self.dir = dir
 
     def __enter__(self) -> Path:
-        self.td = tempfile.TemporaryDirectory()
-        tempfile.tempdir = self.td.name
+        self.td = tempfile.TemporaryDirectory(dir=self.dir)
         tmpdir_path = Path(self.td.name)
         if self.chdir:
             self.old_dir = Path(os.getcwd()).absolute()
@@ -118,11 +247,14 @@ class TempDirEnv:
         if self.chdir:
             os.chdir(self.old_dir)
         self.td.cleanup()
-        tempfile.tempdir = None
 
 
 def temporary_file(
-    *, contents: str | None = None, suffix: str | None = None, delete: bool = True
+    *,
+    contents: str | None = None,
+    suffix: str | None = None,
+    delete: bool = True,
+    dir: Path | None = None,
 ) -> IO[bytes]:
     """Creates a named temporary file with extension
     `suffix` and writes `contents` into it.
@@ -132,13 +264,25 @@ def temporary_file(
             what to write in the temporary file
         suffix (str):
             the file's extension (e.g., ".c")
+        delete (bool):
+            whether the file is deleted when it is closed
+        dir (Path | None):
+            where to create the file, the default temporary directory if None
     Returns:
         tempfile.NamedTemporaryFile:
             a temporary file that is automatically deleted when the object is
             garbage collected
     """
-    ntf = tempfile.NamedTemporaryFile(suffix=suffix, delete=delete)
-    if contents:
-        with open(ntf.name, "w") as f:
-            f.write(contents)
+    ntf = tempfile.NamedTemporaryFile(suffix=suffix, delete=delete, dir=dir)
+    try:
+        if contents:
+            ntf.write(contents.encode("utf-8"))
+            ntf.flush()
+    except BaseException:
+        # don't leak the descriptor or, if delete is False, the file
+        ntf.close()
+        if not delete:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(ntf.name)
+        raise
     return ntf
@@ -6,6 +6,7 @@ from diopter.compiler import (
     CompilerProject,
     ObjectCompilationOutput,
     OptLevel,
+    make_code_compiler_agnostic,
 )
 from diopter.generator import CSmithGenerator
 from diopter.sanitizer import Sanitizer
@@ -55,3 +56,17 @@ def test_preprocessor_make_compiler_agnostic() -> None:
                 pp_with_clang, ObjectCompilationOutput(Path("/dev/null"))
             )
             san.sanitize(pp_with_clang)
+
+
+def test_make_code_compiler_agnostic() -> None:
+    code = """typedef float _Float32;
+extern int __fpclassifyf128 (_Float128 __value);
+extern void *malloc (size_t) __attribute__ ((__malloc__ (free, 1)));
+_Float32 a; _Float32x b; _Float64 c; _Float64x d; _Float128 e;
+"""
+    expected = """
+
+extern void *malloc (size_t) ;
+float a; double b; double c; long double d; _Float128 e;
+"""
+    assert make_code_compiler_agnostic(code) == expected
@@ -1,16 +1,31 @@
+import os
+import subprocess
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from shutil import which
+from typing import Any
 
 import pytest
 
+import diopter.sanitizer
 from diopter.compiler import (
+    AsyncCompilationResult,
     CompilerExe,
     CompilerProject,
+    ExeCompilationOutput,
     Language,
+    ObjectCompilationOutput,
     SourceProgram,
     parse_compiler,
 )
-from diopter.sanitizer import Sanitizer
+from diopter.sanitizer import (
+    SanitizationResult,
+    Sanitizer,
+    compile_warnings_pattern,
+    evict_least_recently_used,
+)
+from diopter.utils import run_cmd_async
 
 
 def find_clang() -> CompilerExe | None:
@@ -55,6 +70,307 @@ def test_check_for_compiler_warnings() -> None:
     assert san.check_for_compiler_warnings(p2).check_warnings_failed
 
 
+def test_check_for_compiler_warnings_with_launcher(tmp_path: Path) -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    # a stand-in for ccache that records its invocations
+    log = tmp_path / "log"
+    launcher = tmp_path / "ccache"
+    launcher.write_text(f'#!/bin/sh\necho "$@" >> {log}\nexec "$@"\n')
+    launcher.chmod(0o755)
+    san = Sanitizer(clang=clang, ccache=launcher, cache_dir=tmp_path)
+
+    assert san.check_for_compiler_warnings(
+        SourceProgram(code="int main(){return 0;}", language=Language.C)
+    )
+    assert san.check_for_compiler_warnings(
+        SourceProgram(code="void main(){}", language=Language.C)
+    ).check_warnings_failed
+    invocations = log.read_text().splitlines()
+    assert len(invocations) == 4
+    assert all("/dev/null" not in invocation for invocation in invocations)
+
+
+def test_check_for_compiler_warnings_with_launcher_relative_paths(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "include").mkdir()
+    (tmp_path / "include" / "header.h").write_text("int f(void);\n")
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "bin").mkdir()
+    launcher = tmp_path / "bin" / "ccache"
+    launcher.write_text('#!/bin/sh\nexec "$@"\n')
+    launcher.chmod(0o755)
+    # the launcher runs the compiler from the temporary directory,
+    # relative paths must still point to the caller's directory
+    san = Sanitizer(
+        clang=clang,
+        ccache=Path("bin/ccache"),
+        cache_dir=Path("cache"),
+        tmp_dir=Path("tmp"),
+    )
+
+    assert san.check_for_compiler_warnings(
+        SourceProgram(
+            code='#include "header.h"\nint main(){return 0;}',
+            language=Language.C,
+            include_paths=("include",),
+        )
+    )
+
+
+def offline_sanitizer() -> Sanitizer:
+    # a sanitizer that can be created without running any compiler
+    return Sanitizer(
+        gcc=CompilerExe(CompilerProject.GCC, Path("gcc"), "12"),
+        clang=CompilerExe(CompilerProject.LLVM, Path("clang"), "14"),
+        use_ccomp_if_available=False,
+        use_gnu2x_if_available=False,
+    )
+
+
+def fake_compilation(script: str) -> AsyncCompilationResult[ObjectCompilationOutput]:
+    return AsyncCompilationResult(
+        script,
+        run_cmd_async(
+            ["sh", "-c", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            new_session=True,
+        ),
+        None,
+        ObjectCompilationOutput(Path("/dev/null")),
+    )
+
+
+def test_collect_warnings_checks() -> None:
+    san = offline_sanitizer()
+    chatty = "head -c 1000000 /dev/zero | tr '\\0' a"
+
+    def collect(*scripts: str, timeout: float = 5) -> SanitizationResult:
+        compilations = [fake_compilation(script) for script in scripts]
+        try:
+            return san.collect_warnings_checks(compilations, time.monotonic() + timeout)
+        finally:
+            for compilation in compilations:
+                compilation.kill()
+
+    assert collect(chatty, chatty)
+    assert collect("echo fine", "exit 1").check_warnings_failed
+    assert collect("sleep 10", "echo fine", timeout=0.5).timeout
+    # the outputs are read concurrently: a warning after lots of output
+    # is found while the first compiler is still running
+    start = time.monotonic()
+    result = collect("sleep 3", f"{chatty}; echo 'incompatible pointer'")
+    assert result.check_warnings_failed
+    assert time.monotonic() - start < 3
+
+
+def test_compile_warnings_pattern() -> None:
+    assert compile_warnings_pattern(()) is None
+
+    pattern = compile_warnings_pattern(
+        (
+            "incompatible pointer",
+            "incompatible pointer to",
+            "(a|b)",
+            "(a|b)",
+            "return type of ‘main’ is not ‘int’",
+        )
+    )
+    assert pattern
+    assert pattern.search(b"test.c:1:1: warning: incompatible pointer types")
+    assert pattern.findall(b"incompatible pointer to integer") == [
+        b"incompatible pointer to"
+    ]
+    assert pattern.search(b"(a|b)")
+    assert not pattern.search(b"a")
+    assert pattern.search("return type of ‘main’ is not ‘int’".encode("utf-8"))
+
+
+def test_sanitization_result_serialization() -> None:
+    for result in (
+        SanitizationResult(),
+        SanitizationResult(check_warnings_failed=True),
+        SanitizationResult(sanitizer_failed=True, timeout=True),
+    ):
+        j = result.to_json_dict()
+        assert SanitizationResult.from_json_dict(j).to_json_dict() == j
+
+
+def test_sanitize_cache(tmp_path: Path) -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    san = Sanitizer(clang=clang, cache_dir=tmp_path)
+    p1 = SourceProgram(code="int main(){return 0;}", language=Language.C)
+    p2 = SourceProgram(code="void main(){}", language=Language.C)
+
+    assert san.sanitize(p1)
+    assert san.sanitize(p2).check_warnings_failed
+    assert len(list((tmp_path / "checks").iterdir())) == 2
+
+    # cached results
+    assert san.sanitize(p1)
+    assert san.sanitize(p2).check_warnings_failed
+    assert len(list((tmp_path / "checks").iterdir())) == 2
+
+    assert san.cache_key(p1) != san.cache_key(p2)
+    assert san.cache_key(p1) != san.cache_key(
+        SourceProgram(code=p1.code, language=Language.C, flags=("-m32",))
+    )
+
+
+def test_sanitize_cache_eviction(tmp_path: Path) -> None:
+    san = offline_sanitizer()
+    san.max_checks_cache_size = 0
+    checks = tmp_path / "checks"
+
+    san.cache_result(SanitizationResult(), checks / "01.json")
+    assert [f.name for f in checks.iterdir()] == ["01.json"]
+
+    # only some writes trim the cache
+    san.cache_result(SanitizationResult(), checks / "00.json")
+    assert not list(checks.iterdir())
+
+
+def test_sanitize_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    san = offline_sanitizer()
+    calls: list[str] = []
+
+    def check_for_compiler_warnings(program: SourceProgram) -> SanitizationResult:
+        calls.append("warnings")
+        return SanitizationResult(check_warnings_failed=True)
+
+    def launch_sanitizer_build(*args: Any) -> ExeCompilationOutput:
+        calls.append("build")
+        return ExeCompilationOutput(Path("/bin/true"))
+
+    monkeypatch.setattr(san, "check_for_compiler_warnings", check_for_compiler_warnings)
+    monkeypatch.setattr(san, "launch_sanitizer_build", launch_sanitizer_build)
+    program = SourceProgram(code="int main(){return 0;}", language=Language.C)
+
+    # by default nothing is built for programs that fail the warnings checks
+    assert san.sanitize(program).check_warnings_failed
+    assert calls == ["warnings"]
+
+    calls.clear()
+    san.early_sanitizer_builds = True
+    assert san.sanitize(program).check_warnings_failed
+    assert calls == ["build", "warnings"]
+
+
+def test_sanitize_cache_write_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    san = offline_sanitizer()
+    monkeypatch.setattr(san, "sanitize_impl", lambda program: SanitizationResult())
+    program = SourceProgram(code="int main(){return 0;}", language=Language.C)
+
+    # the cache directory can't be created
+    san.cache_dir = tmp_path / "file"
+    san.cache_dir.write_text("")
+    assert san.sanitize(program)
+
+    # the cache entry can't be written
+    san.cache_dir = tmp_path / "cache"
+    (san.cache_dir / "checks").mkdir(parents=True)
+
+    def failing_replace(*args: Any) -> None:
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    assert san.sanitize(program)
+    assert not list((san.cache_dir / "checks").iterdir())
+
+
+def test_sanitizer_exe_cache(tmp_path: Path) -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    san = Sanitizer(clang=clang, cache_dir=tmp_path)
+    p1 = SourceProgram(code="int main(){return 0;}", language=Language.C)
+    p2 = SourceProgram(
+        code="int main(){ int a[1] = {0}; return a[1];}", language=Language.C
+    )
+
+    assert san.check_for_sanitizer_errors(p1, "undefined,address")
+    assert san.check_for_sanitizer_errors(p2, "undefined,address").sanitizer_failed
+    assert len(list((tmp_path / "sanitized").iterdir())) == 2
+
+    # cached binaries
+    assert san.check_for_sanitizer_errors(p1, "undefined,address")
+    assert san.check_for_sanitizer_errors(p2, "undefined,address").sanitizer_failed
+    assert len(list((tmp_path / "sanitized").iterdir())) == 2
+
+
+def test_sanitizer_exe_cache_read_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    san = offline_sanitizer()
+    # stands in for clang, the build is never run
+    san.clang = CompilerExe(CompilerProject.LLVM, Path("/bin/true"), "14")
+    program = SourceProgram(code="int main(){return 0;}", language=Language.C)
+    cached_exe = tmp_path / "cached.exe"
+    cached_exe.write_text("")
+
+    def failing(*args: Any) -> None:
+        raise PermissionError()
+
+    # neither linking nor copying the cached binary works
+    monkeypatch.setattr(os, "link", failing)
+    monkeypatch.setattr(diopter.sanitizer, "copy2", failing)
+    build = san.launch_sanitizer_build(
+        program, "undefined,address", tmp_path, cached_exe
+    )
+    assert isinstance(build, AsyncCompilationResult)
+    build.kill()
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    for i, name in enumerate(("a", "b", "c", ".partial")):
+        (tmp_path / name).write_bytes(b"x" * 10)
+        os.utime(tmp_path / name, (i, i))
+    evict_least_recently_used(tmp_path, 20)
+    assert sorted(f.name for f in tmp_path.iterdir()) == [".partial", "b", "c"]
+    evict_least_recently_used(tmp_path, 0)
+    assert [f.name for f in tmp_path.iterdir()] == [".partial"]
+
+
+def test_sanitize_all() -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    san = Sanitizer(clang=clang)
+    good = [
+        SourceProgram(code=f"int main(){{return {i} - {i};}}", language=Language.C)
+        for i in range(4)
+    ]
+    bad = SourceProgram(code="void main(){}", language=Language.C)
+
+    with ProcessPoolExecutor(2) as executor:
+        assert san.sanitize_all(good, executor)
+        assert san.sanitize_all(good + [bad], executor).check_warnings_failed
+
+
+def test_sanitize_all_deduplicates() -> None:
+    clang = find_clang()
+    assert clang, "Could not find a clang executable"
+    san = Sanitizer(clang=clang)
+    program = SourceProgram(code="int main(){return 0;}", language=Language.C)
+
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args: Any, **kwargs: Any) -> Future[Any]:
+            CountingExecutor.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    with CountingExecutor(2) as executor:
+        assert san.sanitize_all([program] * 3, executor)
+    assert CountingExecutor.submitted == 1
+
+
 @pytest.mark.parametrize(
     "code",
     [
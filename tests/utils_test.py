@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from diopter.utils import TempDirEnv, run_cmd, run_cmd_async, temporary_file
+
+
+def test_run_cmd_capture() -> None:
+    assert run_cmd("echo hello").stdout == "hello"
+    output = run_cmd("echo hello", capture=False)
+    assert output.stdout == ""
+    assert output.stderr == ""
+
+
+def test_run_cmd_list_arguments(tmp_path: Path) -> None:
+    f = tmp_path / "a file.txt"
+    f.write_text("contents")
+    assert run_cmd(["cat", str(f)]).stdout == "contents"
+    assert run_cmd(["echo", "a  b"]).stdout == "a  b"
+
+
+def test_run_cmd_input() -> None:
+    assert run_cmd(["cat"], input=b"hello").stdout == "hello"
+    with pytest.raises(ValueError):
+        run_cmd(["cat"], input=b"hello", stdin=subprocess.DEVNULL)
+
+
+def test_run_cmd_large_output() -> None:
+    # much larger than a pipe's buffer
+    output = run_cmd(["sh", "-c", "head -c 1000000 /dev/zero | tr '\\0' a"])
+    assert output.stdout == "a" * 1000000
+
+
+def test_run_cmd_timeout_kills_process_group(tmp_path: Path) -> None:
+    marker = tmp_path / "marker"
+    # the grandchild would create marker after the timeout if it survived
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_cmd(
+            ["sh", "-c", f"(sleep 1; touch {marker}) & wait"],
+            timeout=0.2,
+            new_session=True,
+        )
+    time.sleep(1.5)
+    assert not marker.exists()
+
+
+def test_run_cmd_session() -> None:
+    get_sid = [sys.executable, "-c", "import os; print(os.getsid(0))"]
+    assert run_cmd(get_sid).stdout == str(os.getsid(0))
+    assert run_cmd(get_sid, new_session=True).stdout != str(os.getsid(0))
+    stdout, _ = run_cmd_async(get_sid, text=True).communicate()
+    assert stdout.strip() == str(os.getsid(0))
+    stdout, _ = run_cmd_async(get_sid, text=True, new_session=True).communicate()
+    assert stdout.strip() != str(os.getsid(0))
+
+
+def test_run_cmd_failure() -> None:
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        run_cmd(["sh", "-c", "echo out; echo err >&2; exit 3"])
+    assert e.value.returncode == 3
+    assert e.value.stdout == b"out\n"
+    assert e.value.stderr == b"err\n"
+
+
+def test_temporary_file() -> None:
+    tf = temporary_file(contents="int main(){}", suffix=".c")
+    assert tf.name.endswith(".c")
+    with open(tf.name, "r") as f:
+        assert f.read() == "int main(){}"
+    tf.close()
+    assert not Path(tf.name).exists()
+
+    tf = temporary_file(contents="", delete=False)
+    tf.close()
+    assert Path(tf.name).exists()
+    os.remove(tf.name)
+
+
+def test_temp_dir_env(tmp_path: Path) -> None:
+    default_tempdir = tempfile.gettempdir()
+    with TempDirEnv(dir=tmp_path) as tmpdir:
+        assert tmpdir.parent == tmp_path
+        # the global default must not change
+        assert tempfile.gettempdir() == default_tempdir
+        tf = temporary_file(contents="", dir=tmpdir)
+        assert Path(tf.name).parent == tmpdir
+        tf.close()
+    assert not tmpdir.exists()